@@ -1,11 +1,75 @@
 import warnings
 import numpy as np
 import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
 import matplotlib.transforms as transforms
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import TextPath
 from mriseqplot.style import SeqStyle
+from collections.abc import MutableMapping
 from typing import Callable, List
 
 
+class _Channels(MutableMapping):
+    """ Waveforms by channel name, together with the position of their extrema
+
+    Waveforms are kept read-only, so the only way to change one is to assign or
+    ``add`` to it, both of which keep its extrema up to date.
+    """
+
+    def __init__(self, waveforms=()):
+        self._waveforms = {}
+        self._extrema = {}  # flat indices of the minimum and maximum
+        self.update(waveforms)
+
+    def __getitem__(self, name):
+        return self._waveforms[name]
+
+    def __setitem__(self, name, waveform):
+        waveform = np.array(waveform)  # private copy, the caller's may be writeable
+        waveform.flags.writeable = False
+        self._waveforms[name] = waveform
+        self._extrema[name] = (np.argmin(waveform), np.argmax(waveform))
+
+    def __delitem__(self, name):
+        del self._waveforms[name]
+        del self._extrema[name]
+
+    def __iter__(self):
+        return iter(self._waveforms)
+
+    def __len__(self):
+        return len(self._waveforms)
+
+    def add(self, name, unit):
+        """ Add ``unit`` to a waveform, updating its extrema from the changed samples
+
+        The waveform is rescanned only if one of its extrema was among them.
+        """
+        old = self._waveforms[name]
+        waveform = old + unit
+        waveform.flags.writeable = False
+        changed = np.flatnonzero(np.broadcast_to(unit != 0, waveform.shape))
+        idx_min, idx_max = self._extrema[name]
+        if waveform.shape != old.shape or np.isin([idx_min, idx_max], changed).any():
+            self[name] = waveform
+            return
+        if changed.size:
+            values = waveform.flat[changed]
+            if values.min() < waveform.flat[idx_min]:
+                idx_min = changed[values.argmin()]
+            if values.max() > waveform.flat[idx_max]:
+                idx_max = changed[values.argmax()]
+        self._waveforms[name] = waveform
+        self._extrema[name] = (idx_min, idx_max)
+
+    def extrema(self, name):
+        """ [min, max] of a waveform"""
+        waveform = self._waveforms[name]
+        return [waveform.flat[idx] for idx in self._extrema[name]]
+
+
 class Sequence:
     def __init__(self, t, channels: List[str]):
         """ Initialize sequence diagram
@@ -25,6 +89,7 @@ class Sequence:
         self.channels = {}
         self.axes_names = {}
         self.axes_styles = {}
+        self._template = None  # (key, fig, axes, artists) of the last formatted figure
         for channel in channels:
             self.channels[channel] = np.zeros_like(t)
             self.axes_styles[channel] = SeqStyle()
@@ -36,9 +101,25 @@ class Sequence:
         arrow = kwargs.get("arrow", None)
         style = kwargs.get("style", None)
 
+        # private copies, so that later changes to the caller's lists do not leak in
+        t = np.array(t, dtype=float, ndmin=1).ravel()
+        ampl = np.array(ampl, dtype=float, ndmin=1).ravel()
         item = {"t": t, "ampl": ampl, "text": text, "arrow": arrow, "style": style}
         self.anno[channel_name].append(item)
 
+    @property
+    def channels(self):
+        """ Waveforms by channel name
+
+        Waveforms are read-only arrays: to change one, assign a new array to its
+        channel, e.g. ``sequence.channels["RF"] = 2 * sequence.channels["RF"]``.
+        """
+        return self._channels
+
+    @channels.setter
+    def channels(self, waveforms):
+        self._channels = _Channels(waveforms)
+
     def add_element(self, channel_name: str, callback: Callable, ampl=1, **kwargs):
         """ Generic function to add an element to a waveform
         Parameters
@@ -61,27 +142,29 @@ class Sequence:
         overlap = np.logical_and(self.channels[channel_name], unit)
         if overlap.any():
             warnings.warn(f"Got an overlap in {channel_name} using {callback.__name__}")
-        self.channels[channel_name] = self.channels[channel_name] + unit
-
-    def _format_axes(self, axes, ax2channel, padding_factor=1.1):
-        labels = ax2channel.keys()
-        chan_axes = ax2channel.values()
+        self.channels.add(channel_name, unit)
 
+    def _set_limits(self, axes, padding_factor=1.1):
         # set consistent y-limit as maximum from all plots
         ylim = [0.0, 0.0]
-        for signal in self.channels.values():
-            ylim[0] = min(ylim[0], padding_factor * np.min(signal))
-            ylim[1] = max(ylim[1], padding_factor * np.max(signal))
+        for channel_name in self.channels:
+            signal = self.channels.extrema(channel_name)
+            ylim[0] = min(ylim[0], padding_factor * signal[0])
+            ylim[1] = max(ylim[1], padding_factor * signal[1])
         for chan_anno in self.anno.values():
             for anno in chan_anno:
-                ampl = anno["ampl"]
-                if isinstance(ampl, float):
-                    ampl = [ampl]  # make list
-                ylim[0] = min(ylim[0], min(ampl))
-                ylim[1] = max(ylim[1], max(ampl))
-
-        for ax, style, ax_name in zip(axes, self.axes_styles.values(), labels,):
-            ax.set_yticks([])
+                ylim[0] = min(ylim[0], np.min(anno["ampl"]))
+                ylim[1] = max(ylim[1], np.max(anno["ampl"]))
+
+        # axes are created with shared x and y, so limits need to be set only once
+        axes[0].set_xlim(self.t[0], self.t[-1])
+        axes[0].set_ylim(ylim[0], ylim[1])
+
+    def _format_axes(self, axes, ax2channel):
+        labels = ax2channel.keys()
+        plt.setp(axes, yticks=[])
+
+        for ax, style, ax_name in zip(axes, self.axes_styles.values(), labels):
             ax.set_ylabel(
                 ax_name,
                 fontsize=style.font_size,
@@ -95,17 +178,14 @@ class Sequence:
             ax.set_xlabel("t", fontsize=style.font_size)
             ax.xaxis.set_label_coords(1.02, 0.4)
 
-            for side in ["left", "top", "right", "bottom"]:
-                ax.spines[side].set_visible(False)
+            plt.setp(
+                list(ax.spines.values()),
+                visible=False,
+                linewidth=style.axes_width,
+                color=style.axes_color,
+            )
             ax.spines["bottom"].set_position("zero")
 
-            for side in ["bottom", "left", "top", "right"]:
-                ax.spines[side].set_linewidth(style.axes_width)
-                ax.spines[side].set_color(style.axes_color)
-
-            ax.axes.set_xlim(self.t[0], self.t[-1])
-            ax.axes.set_ylim(ylim[0], ylim[1])
-
             ax.axes.arrow(
                 np.squeeze(self.t[-1]),
                 0,
@@ -120,95 +200,187 @@ class Sequence:
             )
         return axes
 
-    def _plot_annotations(self, ax, name_channel):
-        annotation = self.anno[name_channel]
-        style = self.axes_styles[name_channel]
+    def _plot_annotations(self, ax, channels):
+        """ Draw annotations of all given channels onto one axis
 
-        for anno in annotation:
-            t = anno["t"]
-            ampl = anno["ampl"]
-
-            # get style
-            draw_style = style
-            if anno["style"] is not None:
-                draw_style = anno["style"]  # use channel style
-
-            # draw lines
-            text_alignment = "center"
-            if (not isinstance(t, float) and len(t) > 1) and (
-                not isinstance(ampl, float) and len(ampl) > 1
-            ):
-                has_arrow = anno["arrow"] is not None and anno["arrow"]
-                line_t = t
-                if has_arrow:
-                    line_t[0] += draw_style.arrow_length
-                    line_t[1] -= draw_style.arrow_length
+        Positions are computed for all annotations at once: dimension lines are
+        drawn as one line collection and their arrowheads as one polygon collection
+        per z-order, and overlapping labels are moved apart in one pass. Stored
+        annotations are never modified, so the diagram can be rendered repeatedly.
+        """
+        annotations = []
+        for name_channel in channels:
+            for anno in self.anno[name_channel]:
+                style = anno["style"]
+                if style is None:
+                    style = self.axes_styles[name_channel]  # use channel style
+                annotations.append((anno, style))
+        if not annotations:
+            return
+
+        is_line = np.array(
+            [len(anno["t"]) > 1 and len(anno["ampl"]) > 1 for anno, _ in annotations]
+        )
+        has_arrow = is_line & np.array([bool(anno["arrow"]) for anno, _ in annotations])
+        start = np.array([(anno["t"][0], anno["ampl"][0]) for anno, _ in annotations])
+        end = np.array([(anno["t"][-1], anno["ampl"][-1]) for anno, _ in annotations])
+        arrow_length = np.array([style.arrow_length for _, style in annotations])
+        zorder = np.array([style.zorder for _, style in annotations])
+
+        # unit vectors along the lines, from their start to their end
+        direction = end - start
+        norm = np.linalg.norm(direction, axis=1, keepdims=True)
+        direction /= np.maximum(norm, np.finfo(float).eps)
+
+        # dimension lines, shortened to leave room for the arrowheads
+        shift = direction * np.where(has_arrow, arrow_length, 0)[:, None]
+        for level in np.unique(zorder[is_line]):
+            group = np.flatnonzero(is_line & (zorder == level))
+            lines = []
+            for idx in group:
+                anno = annotations[idx][0]
+                segment = np.column_stack([anno["t"], anno["ampl"]])
+                segment[0] += shift[idx]
+                segment[-1] -= shift[idx]
+                lines.append(segment)
+            ax.add_collection(
+                LineCollection(
+                    lines,
+                    colors=[annotations[idx][1].color for idx in group],
+                    linewidths=[annotations[idx][1].width for idx in group],
+                    clip_on=False,
+                    zorder=level + 40,
+                ),
+                autolim=False,
+            )
 
-                ax.plot(
-                    line_t,
-                    ampl,
-                    color=draw_style.color,
-                    linewidth=draw_style.width,
+        # arrowheads at both ends, pointing outwards along the line
+        for level in np.unique(zorder[has_arrow]):
+            group = np.flatnonzero(has_arrow & (zorder == level))
+            tips = np.concatenate([start[group], end[group]])
+            outwards = np.concatenate([-direction[group], direction[group]])
+            normal = outwards[:, ::-1] * [-1, 1]
+            base = tips - outwards * np.tile(arrow_length[group], 2)[:, None]
+            heads = np.stack([tips, base + 0.075 * normal, base - 0.075 * normal], 1)
+            arrow_styles = [annotations[idx][1] for idx in group] * 2
+            ax.add_collection(
+                PolyCollection(
+                    heads,
+                    facecolors=[style.axes_color for style in arrow_styles],
+                    edgecolors=[style.axes_color for style in arrow_styles],
+                    linewidths=[style.axes_width for style in arrow_styles],
+                    joinstyle="miter",
                     clip_on=False,
-                    zorder=draw_style.zorder + 40,
-                )
-                text_alignment = "bottom"
-
-                if has_arrow:
-                    # left arrow
-                    ax.axes.arrow(
-                        line_t[0],
-                        ampl[0],
-                        -(line_t[-1] - line_t[0]) * 0.000001,
-                        -(ampl[-1] - ampl[0]) * 0.0001,
-                        head_width=0.15,
-                        head_length=draw_style.arrow_length,
-                        lw=draw_style.axes_width,
-                        fc=draw_style.axes_color,
-                        ec=draw_style.axes_color,
-                        clip_on=False,
-                    )
-
-                    # right arrow
-                    ax.axes.arrow(
-                        line_t[-1],
-                        ampl[-1],
-                        (line_t[-1] - line_t[0]) * 0.000001,
-                        (ampl[-1] - ampl[0]) * 0.0001,
-                        head_width=0.15,
-                        head_length=draw_style.arrow_length,
-                        lw=draw_style.axes_width,
-                        fc=draw_style.axes_color,
-                        ec=draw_style.axes_color,
-                        clip_on=False,
-                    )
-
-            # draw text
-            if anno["text"] is not None:
-                textPos = [0, 0]
-                # get text x-position
-                if not isinstance(t, float) and len(t) > 1:
-                    textPos[0] = t[0] + (t[-1] - t[0]) / 2
-                else:
-                    textPos[0] = t
-
-                # get text y-position
-                if not isinstance(ampl, float) and len(ampl) > 1:
-                    textPos[1] = ampl[0] + (ampl[-1] - ampl[0]) / 2
-                else:
-                    textPos[1] = ampl
-
-                # draw text
-                ax.text(
-                    textPos[0],
-                    textPos[1],
-                    anno["text"],
-                    horizontalalignment="center",
-                    verticalalignment=text_alignment,
-                    fontsize=draw_style.font_size,
-                    color=draw_style.font_color,
-                    zorder=draw_style.zorder + 50,
+                    zorder=level + 40,
+                ),
+                autolim=False,
+            )
+
+        # labels, centred on the annotation or sitting on top of its dimension line
+        has_text = np.array([anno["text"] is not None for anno, _ in annotations])
+        if not has_text.any():
+            return
+        labeled = [
+            (str(anno["text"]), style)
+            for (anno, style), text in zip(annotations, has_text)
+            if text
+        ]
+        position = 0.5 * (start + end)[has_text]
+        on_line = is_line[has_text]
+        lift = self._place_labels(ax, position, labeled, on_line)
+        for (text, style), (x, y), line, dy in zip(labeled, position, on_line, lift):
+            ax.text(
+                x,
+                y,
+                text,
+                horizontalalignment="center",
+                verticalalignment="bottom" if line else "center",
+                fontsize=style.font_size,
+                color=style.font_color,
+                zorder=style.zorder + 50,
+                transform=transforms.offset_copy(
+                    ax.transData, fig=ax.figure, y=dy, units="points"
+                ),
+            )
+
+    @staticmethod
+    def _place_labels(ax, position, labeled, on_line, pad=1.5):
+        """ Move overlapping labels apart, returns the shift of every label in points
+
+        Labels are lifted above whatever they collide with. If that would push a
+        label out of the top of its axes, it is moved below its colliders instead,
+        and if it does not fit there either it stays where it is and overlaps:
+        collisions are only resolved within one axis, so a label leaving it would
+        just collide with the neighbouring subplot.
+
+        Label extents are estimated from the glyph outlines and the shifts are in
+        points, so that the vertical spacing holds for any axes height. Horizontal
+        overlap and the available height are judged with the figure as it is at the
+        time of rendering.
+        """
+        size = np.zeros((len(labeled), 2))
+        for idx, (text, style) in enumerate(labeled):
+            if not text:
+                continue  # nothing to draw, nothing to collide with
+            font_size = FontProperties(size=style.font_size).get_size_in_points()
+            lines = text.split("\n")
+            size[idx, 0] = max(
+                (
+                    TextPath((0, 0), line, size=font_size).get_extents().width
+                    if line
+                    else 0.0
                 )
+                for line in lines
+            )
+            size[idx, 1] = 1.2 * font_size * len(lines)
+
+        to_points = 72 / ax.figure.dpi
+        anchor = ax.transData.transform(position) * to_points
+        limits = np.array([ax.bbox.y0, ax.bbox.y1]) * to_points
+        # boxes as [x0, x1, y0, y1], centred on the anchor or resting on top of it
+        boxes = np.column_stack(
+            [
+                anchor[:, 0] - size[:, 0] / 2,
+                anchor[:, 0] + size[:, 0] / 2,
+                anchor[:, 1] - np.where(on_line, 0, size[:, 1] / 2),
+                anchor[:, 1] + np.where(on_line, size[:, 1], size[:, 1] / 2),
+            ]
+        )
+        bottom = boxes[:, 2].copy()
+
+        # bottom to top, each label is moved clear of the ones placed before it
+        visible = np.flatnonzero(size.all(axis=1))
+        order = visible[np.lexsort((boxes[visible, 0], boxes[visible, 2]))]
+        for idx, current in enumerate(order):
+            placed = boxes[order[:idx]]
+            box = Sequence._clear_box(boxes[current], placed, pad)
+            if box[2] != bottom[current] and box[3] > limits[1]:
+                box = Sequence._clear_box(boxes[current], placed, -pad)
+                if box[2] < limits[0]:
+                    box = boxes[current]
+            boxes[current] = box
+        return boxes[:, 2] - bottom
+
+    @staticmethod
+    def _clear_box(box, placed, pad):
+        """ Shift a [x0, x1, y0, y1] box until it overlaps none of the placed ones
+
+        Moves upwards for a positive ``pad`` and downwards for a negative one.
+        """
+        box = box.copy()
+        while True:
+            overlap = (
+                (placed[:, 0] < box[1])
+                & (box[0] < placed[:, 1])
+                & (placed[:, 2] < box[3])
+                & (box[2] < placed[:, 3])
+            )
+            if not overlap.any():
+                return box
+            if pad > 0:
+                box[2:] += placed[overlap, 3].max() + pad - box[2]
+            else:
+                box[2:] += placed[overlap, 2].min() + pad - box[3]
 
     def _plot_channel(self, ax, name_channel):
         signal = self.channels[name_channel]
@@ -254,6 +426,56 @@ class Sequence:
             )
         return ax
 
+    @staticmethod
+    def _axes_style_key(style):
+        """ Hashable summary of everything in a style that the axis setup depends on"""
+        return (
+            style.font_size,
+            style.axes_ticks,
+            style.axes_width,
+            mcolors.to_rgba(style.axes_color),
+            style.arrow_length,
+        )
+
+    def _figure(self, ax2channel):
+        """ Figure with its axes set up for the given mapping
+
+        The figure of the previous render is reused while it is open and neither the
+        mapping nor the styles of the axes changed: everything drawn on it after the
+        setup is removed, the setup itself is kept.
+        """
+        key = (
+            tuple(
+                (label, (channels,) if isinstance(channels, str) else tuple(channels))
+                for label, channels in ax2channel.items()
+            ),
+            tuple(self._axes_style_key(style) for style in self.axes_styles.values()),
+        )
+        if self._template is not None:
+            template_key, fig, axes, artists = self._template
+            if template_key == key and plt.fignum_exists(fig.number):
+                for artist in fig.get_children() + [
+                    child for ax in axes for child in ax.get_children()
+                ]:
+                    if artist not in artists:
+                        artist.remove()
+                plt.figure(fig.number)  # make current again, e.g. for add_vline
+                return fig, axes
+
+        fig, axes = plt.subplots(nrows=len(ax2channel), sharex=True, sharey=True)
+
+        if len(self.channels) == 1:  # a little ugly workaround
+            axes = [axes]
+
+        axes = self._format_axes(axes, ax2channel)
+        # transAxes is easier to use when axes do not have arbitrary offset between
+        # them; the final geometry is also what the annotation labels are placed in
+        plt.subplots_adjust(hspace=0)
+        artists = set(fig.get_children())
+        artists.update(child for ax in axes for child in ax.get_children())
+        self._template = (key, fig, axes, artists)
+        return fig, axes
+
     def plot_scheme(self, ax2channel=None):
         """ Plot the sequence diagram
 
@@ -263,28 +485,24 @@ class Sequence:
             Mapping from subplot / axes labels to channels.
             If not given, every channel will be plotted in its own subplot and channel
             name will be used as subplots's ylabel.
+
+        Repeated calls with the same mapping and axis styles redraw the sequence
+        into the figure returned before, as long as that figure is still open.
         """
         if ax2channel is None:
             # trivial map
             ax2channel = {name: name for name in self.channels.keys()}
 
-        fig, axes = plt.subplots(nrows=len(ax2channel), sharex=True, sharey=True)
-
-        if len(self.channels) == 1:  # a little ugly workaround
-            axes = [axes]
-
-        axes = self._format_axes(axes, ax2channel)
+        fig, axes = self._figure(ax2channel)
+        self._set_limits(axes)
         for ax, (label, channels) in zip(axes, ax2channel.items()):
             # only one channel for this axis
             if isinstance(channels, str):
-                name_channel = channels
-                self._plot_channel(ax, name_channel)
-                self._plot_annotations(ax, name_channel)
+                channels = [channels]
             # this axis represents a number of channels
-            elif isinstance(channels, (list, tuple)):
-                for name_channel in channels:
-                    self._plot_channel(ax, name_channel)
-                    self._plot_annotations(ax, name_channel)
+            for name_channel in channels:
+                self._plot_channel(ax, name_channel)
+            self._plot_annotations(ax, channels)
 
             style = self.axes_styles[name_channel]
             if style.axes_overlayed:
@@ -325,8 +543,6 @@ class Sequence:
                     clip_on=False,
                     zorder=100,
                 )
-        # transAxes is easier to use when axes do not have arbitrary offset between
-        plt.subplots_adjust(hspace=0)
         return fig, axes
 
     def add_vline(self, axes_to_span, t, **kwargs):